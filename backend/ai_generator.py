@@ -1,126 +1,367 @@
-import logging
-from typing import List, Optional
-
-from google import genai
-
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-
-class AIGenerator:
-    """Handles interactions with Gemini API for generating responses"""
-    
-    # Static system prompt to avoid rebuilding on each call
-    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to a comprehensive search tool for course information.
-
-Search Tool Usage:
-- Use the search tool `search_course_content` **only** for questions about specific course content or detailed educational materials.
-- For queries about a course outline, use the `get_course_outline` tool. When you do, return the course title, link, and the number and title of each lesson.
-- **You can make up to 2 sequential tool calls to answer complex questions.**
-- Synthesize search results into accurate, fact-based responses
-- If search yields no results, state this clearly without offering alternatives
-
-Response Protocol:
-- **General knowledge questions**: Answer using existing knowledge without searching
-- **Course-specific questions**: Search first, then answer
-- **No meta-commentary**:
- - Provide direct answers only — no reasoning process, search explanations, or question-type analysis
- - Do not mention "based on the search results"
-
-
-All responses must be:
-1. **Brief, Concise and focused** - Get to the point quickly
-2. **Educational** - Maintain instructional value
-3. **Clear** - Use accessible language
-4. **Example-supported** - Include relevant examples when they aid understanding
-Provide only the direct answer to what was asked.
-"""
-    MAX_TOOL_ROUNDS = 2
-    
-    def __init__(self, api_key: str, model: str):
-        self.client = genai.Client(api_key=api_key)
-        self.model = model
-    
-    def generate_response(self, query: str,
-                         conversation_history: Optional[str] = None,
-                         tools: Optional[List] = None,
-                         tool_manager=None) -> str:
-        """
-        Generate AI response with optional tool usage and conversation context.
-        
-        Args:
-            query: The user's question or request
-            conversation_history: Previous messages for context
-            tools: Available tools the AI can use
-            tool_manager: Manager to execute tools
-            
-        Returns:
-            Generated response as string
-        """
-        
-        # Prepare API call parameters efficiently
-        config = {
-            "temperature": 0,
-            "max_output_tokens": 800
-        }
-        if tools:
-            config["tools"] = tools
-        
-        # Build conversation history
-        history = []
-        if conversation_history:
-            history.append({"role": "user", "parts": [{"text": conversation_history}]})
-        history.append({"role": "user", "parts": [{"text": self.SYSTEM_PROMPT}]})
-        history.append({"role": "user", "parts": [{"text": query}]})
-
-        for _ in range(self.MAX_TOOL_ROUNDS):
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=history,
-                config=config
-            )
-
-            # If no tool call, return the response
-            if not (
-                response.candidates and
-                response.candidates[0].content.parts and
-                response.candidates[0].content.parts[0].function_call
-            ):
-                return response.text
-
-            # Handle tool execution if needed
-            if not tool_manager:
-                logger.warning("Model requested a tool call, but no tool manager was provided.")
-                return response.text
-
-            # Append the assistant's response with tool call to history
-            history.append(response.candidates[0].content)
-
-            # Execute all tool calls and collect results
-            for part in response.candidates[0].content.parts:
-                if part.function_call:
-                    try:
-                        tool_response = tool_manager.execute_tool(
-                            part.function_call.name,
-                            **part.function_call.args
-                        )
-                        history.append({
-                            "role": "function",
-                            "parts": [{
-                                "function_response": {
-                                    "name": part.function_call.name,
-                                    "response": {"result": tool_response}
-                                }
-                            }]
-                        })
-                    except Exception as e:
-                        logger.error(f"Error executing tool {part.function_call.name}: {e}")
-                        return "An error occurred while executing the tool."
-
-        # After max rounds, get a final response
-        final_response = self.client.models.generate_content(
-            model=self.model,
-            contents=history,
-            config=config
-        )
-        return final_response.text
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+from google import genai
+import httpx
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Connection pool limits shared by the sync and async transports. Keeping
+# connections alive amortizes TCP+TLS handshakes across queries instead of
+# paying them on every generate_content call.
+_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+
+# Fallback answer when tool execution fails. Exposed at module level so
+# callers (e.g. RAGSystem) can recognize the error path and avoid caching
+# or otherwise reusing a transient failure.
+TOOL_ERROR_RESPONSE = "An error occurred while executing the tool."
+
+
+class AIGenerator:
+    """Handles interactions with Gemini API for generating responses"""
+    
+    # Static system prompt to avoid rebuilding on each call
+    SYSTEM_PROMPT = """ You are an AI assistant specialized in course materials and educational content with access to a comprehensive search tool for course information.
+
+Search Tool Usage:
+- Use the search tool `search_course_content` **only** for questions about specific course content or detailed educational materials.
+- For queries about a course outline, use the `get_course_outline` tool. When you do, return the course title, link, and the number and title of each lesson.
+- **You can make up to 2 sequential tool calls to answer complex questions.**
+- Synthesize search results into accurate, fact-based responses
+- If search yields no results, state this clearly without offering alternatives
+
+Response Protocol:
+- **General knowledge questions**: Answer using existing knowledge without searching
+- **Course-specific questions**: Search first, then answer
+- **No meta-commentary**:
+ - Provide direct answers only — no reasoning process, search explanations, or question-type analysis
+ - Do not mention "based on the search results"
+
+
+All responses must be:
+1. **Brief, Concise and focused** - Get to the point quickly
+2. **Educational** - Maintain instructional value
+3. **Clear** - Use accessible language
+4. **Example-supported** - Include relevant examples when they aid understanding
+Provide only the direct answer to what was asked.
+"""
+    SUMMARY_PROMPT = (
+        "Condense the following conversation into a short factual summary that "
+        "preserves the topics discussed, specific courses and lessons mentioned, "
+        "and any answers given. Reply with the summary only."
+    )
+
+    MAX_TOOL_ROUNDS = 2
+
+    # Explicit content-cache lifetime; refresh a bit early so no request ever
+    # references an expired cache.
+    CACHE_TTL_SECONDS = 3600
+    CACHE_REFRESH_MARGIN_SECONDS = 300
+
+
+    def __init__(self, api_key: str, model: str,
+                 summary_model: str = "gemini-2.5-flash-lite",
+                 client: Optional[genai.Client] = None):
+        # Reuse one pooled client per process (RAGSystem constructs a single
+        # AIGenerator); an injected client allows sharing it more widely.
+        self.client = client or genai.Client(
+            api_key=api_key,
+            http_options=genai.types.HttpOptions(
+                client_args={"limits": _POOL_LIMITS},
+                async_client_args={"limits": _POOL_LIMITS},
+            ),
+        )
+        self.model = model
+        self.summary_model = summary_model
+        # Explicit context-cache state for the static SYSTEM_PROMPT + tools
+        # prefix; populated lazily on the first tool-enabled request.
+        self._cached_content_name: Optional[str] = None
+        self._cache_expires_at = 0.0
+        self._cache_disabled = False
+        # Last built generate_content config, reused while the tool list and
+        # content cache stay unchanged
+        self._last_config: Optional[dict] = None
+        self._last_config_key = None
+
+    def summarize_conversation(self, transcript: str) -> str:
+        """Compress older conversation turns into a short summary note"""
+        response = self.client.models.generate_content(
+            model=self.summary_model,
+            contents=f"{self.SUMMARY_PROMPT}\n\n{transcript}",
+            config={"temperature": 0, "max_output_tokens": 200}
+        )
+        return response.text
+
+    async def _get_cached_content(self, tools: List) -> Optional[str]:
+        """
+        Create (or refresh) the explicit content cache holding SYSTEM_PROMPT
+        and the tool definitions, which are identical across every request.
+
+        Returns the cache resource name, or None when explicit caching is
+        unavailable (e.g. the prefix is below the model's minimum cached
+        token count) — callers then fall back to sending the prefix inline.
+        """
+        if self._cache_disabled:
+            return None
+
+        now = time.monotonic()
+        if self._cached_content_name and now < self._cache_expires_at:
+            return self._cached_content_name
+
+        try:
+            cache = await self.client.aio.caches.create(
+                model=self.model,
+                config={
+                    "system_instruction": self.SYSTEM_PROMPT,
+                    "tools": tools,
+                    "ttl": f"{self.CACHE_TTL_SECONDS}s"
+                }
+            )
+        except Exception as e:
+            logger.info(f"Explicit context caching unavailable, sending prompt inline: {e}")
+            self._cache_disabled = True
+            return None
+
+        self._cached_content_name = cache.name
+        self._cache_expires_at = now + self.CACHE_TTL_SECONDS - self.CACHE_REFRESH_MARGIN_SECONDS
+        return self._cached_content_name
+
+    async def _build_config(self, tools: Optional[List]) -> dict:
+        """
+        Assemble the generate_content config. The system prompt goes in the
+        native system_instruction slot: it stays out of the chat turns and,
+        as a stable prefix, is eligible for Gemini's implicit context caching
+        instead of being re-billed as user input on every call. When the
+        explicit content cache is available it is referenced instead.
+        """
+        cached_content = await self._get_cached_content(tools) if tools else None
+
+        # The config is static per (tool list, content cache) pair —
+        # ToolManager hands out the same cached list every request — so reuse
+        # the previously built dict instead of reallocating it per call
+        key = (id(tools) if tools is not None else None, cached_content)
+        if self._last_config is not None and self._last_config_key == key:
+            return self._last_config
+
+        config = {
+            "temperature": 0,
+            "max_output_tokens": 800
+        }
+        if cached_content:
+            config["cached_content"] = cached_content
+        else:
+            config["system_instruction"] = self.SYSTEM_PROMPT
+            if tools:
+                config["tools"] = tools
+
+        self._last_config_key = key
+        self._last_config = config
+        return config
+
+    async def _execute_tool_calls(self, tool_manager, calls: List, history: List,
+                                  collected_sources: List[dict]):
+        """
+        Execute all tool calls from one assistant turn concurrently so their
+        vector-store I/O overlaps, then append results in call order.
+
+        Sources returned by the tools accumulate into collected_sources, the
+        per-request list that travels back to the caller — tool state is
+        shared across concurrent requests, so sources are never read from it.
+        """
+        # Tool execution is sync CPU/IO-bound (vector search), so run it off
+        # the event loop. Multiple calls in one turn go through the batched
+        # entry point, which embeds their queries in a single forward pass.
+        if len(calls) > 1:
+            tool_responses = await asyncio.to_thread(
+                tool_manager.execute_tools,
+                [(call.name, dict(call.args)) for call in calls]
+            )
+        else:
+            tool_responses = [await asyncio.to_thread(
+                tool_manager.execute_tool, calls[0].name, **calls[0].args
+            )]
+
+        for call, (tool_response, sources) in zip(calls, tool_responses):
+            for source in sources:
+                if source not in collected_sources:
+                    collected_sources.append(source)
+            history.append({
+                "role": "function",
+                "parts": [{
+                    "function_response": {
+                        "name": call.name,
+                        "response": {"result": tool_response}
+                    }
+                }]
+            })
+
+    async def generate_response(self, query: str,
+                                conversation_history: Optional[List[dict]] = None,
+                                tools: Optional[List] = None,
+                                tool_manager=None) -> Tuple[str, List[dict]]:
+        """
+        Generate AI response with optional tool usage and conversation context.
+
+        Runs against the async Gemini client so the event loop stays free to
+        serve other requests during the network wait.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous turns as Gemini content dicts
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Returns:
+            (generated response, sources gathered from this request's tool
+            calls) — sources are per-request state, never read from the
+            shared tools
+        """
+
+        config = await self._build_config(tools)
+
+        # Build conversation history from prior structured turns
+        history = list(conversation_history) if conversation_history else []
+        history.append({"role": "user", "parts": [{"text": query}]})
+
+        # Fast path: without tools the model cannot emit function calls, so
+        # skip the tool loop entirely
+        if not tools:
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=history,
+                config=config
+            )
+            return response.text, []
+
+        collected_sources: List[dict] = []
+        for _ in range(self.MAX_TOOL_ROUNDS):
+            response = await self.client.aio.models.generate_content(
+                model=self.model,
+                contents=history,
+                config=config
+            )
+
+            # If no tool call, return the response
+            if not (
+                response.candidates and
+                response.candidates[0].content.parts and
+                response.candidates[0].content.parts[0].function_call
+            ):
+                return response.text, collected_sources
+
+            # Handle tool execution if needed
+            if not tool_manager:
+                logger.warning("Model requested a tool call, but no tool manager was provided.")
+                return response.text, collected_sources
+
+            # Append the assistant's response with tool call to history
+            history.append(response.candidates[0].content)
+
+            calls = [
+                part.function_call
+                for part in response.candidates[0].content.parts
+                if part.function_call
+            ]
+            try:
+                await self._execute_tool_calls(tool_manager, calls, history, collected_sources)
+            except Exception as e:
+                logger.error(f"Error executing tools: {e}")
+                return TOOL_ERROR_RESPONSE, collected_sources
+
+        # After max rounds, get a final response
+        final_response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=history,
+            config=config
+        )
+        return final_response.text, collected_sources
+
+    async def generate_response_stream(self, query: str,
+                                       conversation_history: Optional[List[dict]] = None,
+                                       tools: Optional[List] = None,
+                                       tool_manager=None,
+                                       collected_sources: Optional[List[dict]] = None):
+        """
+        Stream response text for a query, yielding deltas as they arrive.
+
+        Tool-call turns carry no user-visible text, so they are handled
+        between streams: when the model emits function calls the stream is
+        drained, the tools run, and streaming resumes on the next turn. The
+        first token reaches the caller as soon as Gemini produces it.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous turns as Gemini content dicts
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+            collected_sources: Optional list that receives the sources from
+                this request's tool calls (an async generator cannot return
+                them, so the caller provides the accumulator)
+
+        Yields:
+            Text deltas of the generated response
+        """
+
+        config = await self._build_config(tools)
+        if collected_sources is None:
+            collected_sources = []
+
+        # Build conversation history from prior structured turns
+        history = list(conversation_history) if conversation_history else []
+        history.append({"role": "user", "parts": [{"text": query}]})
+
+        for _ in range(self.MAX_TOOL_ROUNDS):
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=history,
+                config=config
+            )
+
+            # Function calls may arrive spread over several chunks (and mixed
+            # with text), so collect every function-call part of the round
+            # before running the tool phase instead of keeping only the last
+            # chunk's content
+            tool_call_parts = []
+            async for chunk in stream:
+                if not chunk.candidates:
+                    continue
+                content = chunk.candidates[0].content
+                if content and content.parts:
+                    tool_call_parts.extend(
+                        part for part in content.parts if part.function_call
+                    )
+                if chunk.text:
+                    yield chunk.text
+
+            # If no tool call, the streamed text was the full response
+            if not tool_call_parts:
+                return
+
+            if not tool_manager:
+                logger.warning("Model requested a tool call, but no tool manager was provided.")
+                return
+
+            history.append({"role": "model", "parts": tool_call_parts})
+
+            calls = [part.function_call for part in tool_call_parts]
+            try:
+                await self._execute_tool_calls(tool_manager, calls, history, collected_sources)
+            except Exception as e:
+                logger.error(f"Error executing tools: {e}")
+                yield TOOL_ERROR_RESPONSE
+                return
+
+        # Tool rounds exhausted: mirror the non-streaming path with one final
+        # generation, streaming only its text so the caller always receives
+        # an answer even if the model keeps asking for tools
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=history,
+            config=config
+        )
+        async for chunk in stream:
+            if chunk.candidates and chunk.text:
+                yield chunk.text
@@ -1,11 +1,14 @@
+import asyncio
 import contextlib
+import json
 import logging
 import os
-from typing import List, Optional
+from typing import List, Optional, TypedDict
 import warnings
 
 import fastapi
 from fastapi.middleware import cors
+from fastapi.middleware import gzip
 from fastapi import staticfiles
 from fastapi import responses
 from fastapi.middleware import trustedhost
@@ -20,18 +23,37 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 
+async def _load_documents(application: fastapi.FastAPI, docs_path: str):
+    """Ingest course documents off the event loop and flag readiness"""
+    try:
+        courses, chunks = await asyncio.to_thread(
+            rag_system.add_course_folder, docs_path, False
+        )
+        logger.info(f"Loaded {courses} courses with {chunks} chunks")
+    except Exception as e:
+        logger.error(f"Error loading documents: {e}")
+    finally:
+        application.state.documents_loaded = True
+
+
 @contextlib.asynccontextmanager
-async def lifespan(_: fastapi.FastAPI):
-    """Load initial documents on startup"""
+async def lifespan(application: fastapi.FastAPI):
+    """Kick off document loading in the background on startup.
+
+    Ingestion runs in a worker thread so the server starts accepting
+    traffic immediately instead of waiting for embedding to finish.
+    """
     docs_path = "../docs"
+    application.state.documents_loaded = False
+    load_task = None
     if os.path.exists(docs_path):
-        logger.info("Loading initial documents...")
-        try:
-            courses, chunks = rag_system.add_course_folder(docs_path, clear_existing=False)
-            logger.info(f"Loaded {courses} courses with {chunks} chunks")
-        except Exception as e:
-            logger.error(f"Error loading documents: {e}")
+        logger.info("Loading initial documents in the background...")
+        load_task = asyncio.create_task(_load_documents(application, docs_path))
+    else:
+        application.state.documents_loaded = True
     yield
+    if load_task and not load_task.done():
+        load_task.cancel()
 
 
 # Initialize FastAPI app
@@ -39,8 +61,14 @@ app = fastapi.FastAPI(
     title="Course Materials RAG System",
     root_path="",
     lifespan=lifespan,
+    # orjson serialization speeds up /api/query responses with large source lists
+    default_response_class=responses.ORJSONResponse,
 )
 
+# Compress response bodies above half a KB; query answers with their source
+# lists shrink several-fold for a small CPU cost
+app.add_middleware(gzip.GZipMiddleware, minimum_size=500)
+
 # Add trusted host middleware for proxy
 app.add_middleware(
     trustedhost.TrustedHostMiddleware,
@@ -61,6 +89,12 @@ app.add_middleware(
 rag_system = RAGSystem(config)
 
 # Pydantic models for request/response
+class Source(TypedDict):
+    """A single search result backing an answer"""
+    source: str
+    link: Optional[str]
+
+
 class QueryRequest(pydantic.BaseModel):
     """Request model for course queries"""
     query: str
@@ -69,8 +103,10 @@ class QueryRequest(pydantic.BaseModel):
 
 class QueryResponse(pydantic.BaseModel):
     """Response model for course queries"""
+    # Explicit source keys let pydantic validate entries directly instead of
+    # introspecting generic dicts on every response
     answer: str
-    sources: List[dict]
+    sources: List[Source]
     session_id: str
 
 
@@ -91,7 +127,7 @@ async def query_documents(request: QueryRequest):
             session_id = rag_system.session_manager.create_session()
         
         # Process query using RAG system
-        answer, sources = rag_system.query(request.query, session_id)
+        answer, sources = await rag_system.query(request.query, session_id)
         
         return QueryResponse(
             answer=answer,
@@ -102,6 +138,26 @@ async def query_documents(request: QueryRequest):
         raise fastapi.HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/query/stream")
+async def query_documents_stream(request: QueryRequest):
+    """Process a query, streaming the answer as server-sent events.
+
+    Emits `data:` events with {"delta": text} while the answer is generated,
+    followed by a final event carrying sources and session_id. Streaming cuts
+    time-to-first-byte from the full generation time to the first token.
+    """
+    # Create session if not provided
+    session_id = request.session_id
+    if not session_id:
+        session_id = rag_system.session_manager.create_session()
+
+    async def event_stream():
+        async for event in rag_system.query_stream(request.query, session_id):
+            yield f"data: {json.dumps(event)}\n\n"
+
+    return responses.StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.get("/api/courses", response_model=CourseStats)
 async def get_course_stats():
     """Get course analytics and statistics"""
@@ -11,6 +11,7 @@ class Config:
     # Gemini API settings
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = "gemini-2.5-flash"
+    SUMMARY_MODEL: str = "gemini-2.5-flash-lite"  # Cheap model for history summarization
     
     # Embedding model settings
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
@@ -19,7 +20,8 @@ class Config:
     CHUNK_SIZE: int = 800       # Size of text chunks for vector storage
     CHUNK_OVERLAP: int = 100     # Characters to overlap between chunks
     MAX_RESULTS: int = 5         # Maximum search results to return
-    MAX_HISTORY: int = 2         # Number of conversation messages to remember
+    MAX_HISTORY: int = 2         # Number of conversation exchanges kept verbatim
+    MAX_TURNS: int = 12          # Total messages before older ones are summarized
     
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
@@ -1,3 +1,5 @@
+import asyncio
+import hashlib
 import logging
 import os
 from typing import Dict, List, Optional, Tuple
@@ -5,6 +7,7 @@ from typing import Dict, List, Optional, Tuple
 import ai_generator
 import document_processor
 import models
+import response_cache
 import search_tools
 import session_manager
 import vector_store
@@ -31,8 +34,23 @@ class RAGSystem:
         self.tool_manager.register_tool(self.outline_tool)
         
         # Initialize AI Generator with tools
-        self.ai_generator = ai_generator.AIGenerator(config.GEMINI_API_KEY, config.GEMINI_MODEL)
-        self.session_manager = session_manager.SessionManager(config.MAX_HISTORY)
+        self.ai_generator = ai_generator.AIGenerator(
+            config.GEMINI_API_KEY, config.GEMINI_MODEL,
+            summary_model=config.SUMMARY_MODEL
+        )
+        self.session_manager = session_manager.SessionManager(
+            config.MAX_HISTORY,
+            max_turns=config.MAX_TURNS,
+            summarizer=self.ai_generator.summarize_conversation
+        )
+
+        # Semantic cache of generated answers, sharing the vector store's
+        # embedding model
+        self.response_cache = response_cache.ResponseCache(self.vector_store)
+
+        # In-flight query futures keyed on (session_id, query hash), used to
+        # coalesce identical concurrent requests
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
         
     def add_course_document(self, file_path: str) -> Tuple[models.Course, int]:
         """
@@ -53,7 +71,11 @@ class RAGSystem:
             
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
-            
+
+            # Cached outlines and tool results may now be stale
+            self.outline_tool.clear_outline_cache()
+            self.tool_manager.clear_result_cache()
+
             return course, len(course_chunks)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
@@ -84,7 +106,11 @@ class RAGSystem:
         
         # Get existing course titles to avoid re-processing
         existing_course_titles = set(self.vector_store.get_existing_course_titles())
-        
+
+        # Queue chunks from all new courses so they embed as one batched pass
+        # instead of a separate embedding call per course
+        pending_chunks = []
+
         # Process each file in the folder
         for file_name in os.listdir(folder_path):
             file_path = os.path.join(folder_path, file_name)
@@ -93,11 +119,11 @@ class RAGSystem:
                     # Check if this course might already exist
                     # We'll process the document to get the course ID, but only add if new
                     course, course_chunks = self.document_processor.process_course_document(file_path)
-                    
+
                     if course and course.title not in existing_course_titles:
                         # This is a new course - add it to the vector store
                         self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
+                        pending_chunks.extend(course_chunks)
                         total_courses += 1
                         total_chunks += len(course_chunks)
                         print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
@@ -106,20 +132,53 @@ class RAGSystem:
                         print(f"Course already exists: {course.title} - skipping")
                 except Exception as e:
                     print(f"Error processing {file_name}: {e}")
-        
+
+        if pending_chunks:
+            self.vector_store.add_course_content(pending_chunks)
+
+        # Cached outlines and tool results may now be stale
+        if clear_existing or total_courses:
+            self.outline_tool.clear_outline_cache()
+            self.tool_manager.clear_result_cache()
+
         return total_courses, total_chunks
     
-    def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
+    async def query(self, query: str, session_id: Optional[str] = None) -> Tuple[str, List[str]]:
         """
         Process a user query using the RAG system with tool-based search.
-        
+
+        Identical queries already in flight for the same session (e.g. a
+        double-submitted form) are coalesced: the duplicate awaits the first
+        call's result instead of launching a second Gemini round-trip.
+
         Args:
             query: User's question
             session_id: Optional session ID for conversation context
-            
+
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
+        key = (session_id, hashlib.sha256(query.encode()).digest())
+        existing = self._inflight.get(key)
+        if existing is not None:
+            return await existing
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._execute_query(query, session_id)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited duplicate doesn't warn at GC
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _execute_query(self, query: str, session_id: Optional[str]) -> Tuple[str, List[str]]:
+        """Run the full cache/generate/persist pipeline for one query"""
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
@@ -127,32 +186,122 @@ class RAGSystem:
         history = None
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
-        
-        # Generate response using AI with tools
+
+        # Serve repeats from the semantic cache. History-bearing queries are
+        # context-dependent, so only fresh-context exchanges are cached. The
+        # lookup embeds the query (a sync model forward pass), so it runs off
+        # the event loop.
+        if history is None:
+            cached = await asyncio.to_thread(self.response_cache.get, query)
+            if cached is not None:
+                answer, sources = cached
+                if session_id:
+                    await asyncio.to_thread(
+                        self.session_manager.add_exchange, session_id, query, answer)
+                return answer, sources
+
+        # Generate response using AI with tools; sources come back with the
+        # response so concurrent requests cannot observe each other's
         try:
-            response = self.ai_generator.generate_response(
+            response, sources = await self.ai_generator.generate_response(
                 query=prompt,
                 conversation_history=history,
                 tools=self.tool_manager.get_tool_definitions(),
                 tool_manager=self.tool_manager
             )
-
-            # Get sources from the search tool
-            sources = self.tool_manager.get_last_sources()
-
-            # Reset sources after retrieving them
-            self.tool_manager.reset_sources()
             
-            # Update conversation history
+            # Cache the answer for future semantically-similar queries.
+            # Empty answers and the tool-failure fallback are transient, so
+            # caching them would keep serving the failure to this query and
+            # its semantic neighbours for the whole TTL.
+            if history is None and response and response != ai_generator.TOOL_ERROR_RESPONSE:
+                await asyncio.to_thread(
+                    self.response_cache.put, query, response, sources)
+
+            # Update conversation history. Only the user question and final
+            # answer are persisted — intermediate function_call and
+            # function_response turns stay local to generate_response, so
+            # session prefill doesn't grow with tool traffic. Persisting may
+            # trigger compaction, whose summarization call is synchronous, so
+            # it runs off the event loop.
             if session_id:
-                self.session_manager.add_exchange(session_id, query, response)
-            
+                await asyncio.to_thread(
+                    self.session_manager.add_exchange, session_id, query, response)
+
             # Return response with sources from tool searches
             return response, sources
         except Exception as e:
             logger.exception(f"Error generating response:\n{e}")
             raise
-    
+
+    async def query_stream(self, query: str, session_id: Optional[str] = None):
+        """
+        Process a user query, streaming the answer as it is generated.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            Event dicts: {"delta": text} while the answer streams, then a
+            final {"sources": [...], "session_id": ...} event. On failure an
+            {"error": ...} event is emitted instead.
+        """
+        # Create prompt for the AI with clear instructions
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        # Get conversation history if session exists
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        # Serve repeats from the semantic cache (fresh-context queries only);
+        # the lookup embeds the query, so it runs off the event loop
+        if history is None:
+            cached = await asyncio.to_thread(self.response_cache.get, query)
+            if cached is not None:
+                answer, sources = cached
+                if session_id:
+                    await asyncio.to_thread(
+                        self.session_manager.add_exchange, session_id, query, answer)
+                yield {"delta": answer}
+                yield {"sources": sources, "session_id": session_id}
+                return
+
+        answer_parts = []
+        # Per-request accumulator for tool sources; filled as the stream's
+        # tool rounds run
+        sources: List[dict] = []
+        try:
+            async for delta in self.ai_generator.generate_response_stream(
+                query=prompt,
+                conversation_history=history,
+                tools=self.tool_manager.get_tool_definitions(),
+                tool_manager=self.tool_manager,
+                collected_sources=sources
+            ):
+                answer_parts.append(delta)
+                yield {"delta": delta}
+
+            response = "".join(answer_parts)
+
+            # Cache the answer for future semantically-similar queries;
+            # never cache empty answers or the tool-failure fallback
+            if history is None and response and response != ai_generator.TOOL_ERROR_RESPONSE:
+                await asyncio.to_thread(
+                    self.response_cache.put, query, response, sources)
+
+            # Update conversation history off the loop (may compact/summarize);
+            # an empty answer carries no signal worth persisting
+            if session_id and response:
+                await asyncio.to_thread(
+                    self.session_manager.add_exchange, session_id, query, response)
+
+            yield {"sources": sources, "session_id": session_id}
+        except Exception as e:
+            logger.exception(f"Error generating streamed response:\n{e}")
+            yield {"error": str(e)}
+
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
@@ -0,0 +1,108 @@
+import collections
+import json
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """Semantic cache of generated answers keyed on query embeddings.
+
+    Reuses a prior (answer, sources) pair when a new query matches a cached
+    one exactly or embeds within SIMILARITY_THRESHOLD of it, skipping both
+    the vector search and the Gemini round-trip on a hit.
+    """
+
+    # Cosine similarity required to treat two queries as equivalent
+    SIMILARITY_THRESHOLD = 0.97
+    MAX_ENTRIES = 1000
+    # Entries expire after an hour so answers track course-content updates
+    TTL_SECONDS = 3600
+
+    def __init__(self, vector_store):
+        # Exact-match fast path: query string -> (answer, sources, stored_at)
+        self._exact = {}
+        # Tool execution runs in worker threads, so guard the bookkeeping
+        self._lock = threading.Lock()
+        # Insertion order for FIFO eviction of the semantic entries
+        self._ids = collections.deque()
+        self._counter = 0
+
+        # Dedicated collection using the same embedding model as the chunks.
+        # Cosine space so distances map directly to similarity. Recreated on
+        # startup so stale answers don't outlive a content refresh.
+        client = vector_store.client
+        try:
+            client.delete_collection("query_cache")
+        except Exception:
+            pass
+        self._collection = client.get_or_create_collection(
+            name="query_cache",
+            embedding_function=vector_store.embedding_function,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def _is_expired(self, stored_at: Optional[float]) -> bool:
+        """Check whether an entry written at stored_at has outlived its TTL"""
+        return stored_at is not None and time.monotonic() - stored_at > self.TTL_SECONDS
+
+    def get(self, query: str) -> Optional[Tuple[str, List[dict]]]:
+        """Return a cached (answer, sources) for the query, or None on miss"""
+        with self._lock:
+            hit = self._exact.get(query)
+        if hit is not None:
+            answer, sources, stored_at = hit
+            if self._is_expired(stored_at):
+                with self._lock:
+                    self._exact.pop(query, None)
+            else:
+                return answer, sources
+
+        try:
+            results = self._collection.query(query_texts=[query], n_results=1)
+            if not results['ids'][0]:
+                return None
+            # Cosine distance = 1 - similarity
+            if results['distances'][0][0] > 1.0 - self.SIMILARITY_THRESHOLD:
+                return None
+            metadata = results['metadatas'][0][0]
+            if self._is_expired(metadata.get('stored_at')):
+                return None
+            return metadata['answer'], json.loads(metadata['sources'])
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None
+
+    def put(self, query: str, answer: str, sources: List[dict]):
+        """Store a generated answer for future semantically-similar queries"""
+        stored_at = time.monotonic()
+        with self._lock:
+            self._exact[query] = (answer, sources, stored_at)
+        try:
+            with self._lock:
+                self._counter += 1
+                entry_id = f"q_{self._counter}"
+            self._collection.add(
+                documents=[query],
+                metadatas=[{
+                    "answer": answer,
+                    "sources": json.dumps(sources),
+                    "stored_at": stored_at
+                }],
+                ids=[entry_id]
+            )
+            with self._lock:
+                self._ids.append((entry_id, query))
+                # Evict oldest entries once over capacity
+                evicted = []
+                while len(self._ids) > self.MAX_ENTRIES:
+                    old_id, old_query = self._ids.popleft()
+                    self._exact.pop(old_query, None)
+                    evicted.append(old_id)
+            if evicted:
+                self._collection.delete(ids=evicted)
+        except Exception as e:
+            logger.warning(f"Response cache write failed: {e}")
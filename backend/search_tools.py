@@ -1,13 +1,67 @@
 import abc
+import collections
+import concurrent.futures
 import logging
-from typing import Optional
+import threading
+import time
+from typing import List, Optional, Tuple
 
 from google import genai
+import orjson
+
 import vector_store
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging configuration is left to the application entrypoint
 logger = logging.getLogger(__name__)
 
+# Shared pool for fanning batched searches out over filter groups; each
+# group is one Chroma query, so a handful of workers covers realistic turns
+_GROUP_POOL = concurrent.futures.ThreadPoolExecutor(
+    max_workers=8, thread_name_prefix="search-group"
+)
+
+# Tool schemas are static, so declare them once at module scope and share
+# the built genai.types.Tool across all instances by reference
+_SEARCH_COURSE_CONTENT_SCHEMA = {
+    "name": "search_course_content",
+    "description": "Search course materials with smart course name matching and lesson filtering",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "query": {
+                "type": "string",
+                "description": "What to search for in the course content"
+            },
+            "course_name": {
+                "type": "string",
+                "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')"
+            },
+            "lesson_number": {
+                "type": "integer",
+                "description": "Specific lesson number to search within (e.g. 1, 2, 3)"
+            }
+        },
+        "required": ["query"]
+    }
+}
+_SEARCH_TOOL_DEF = genai.types.Tool(function_declarations=[_SEARCH_COURSE_CONTENT_SCHEMA])
+
+_GET_COURSE_OUTLINE_SCHEMA = {
+    "name": "get_course_outline",
+    "description": "Get the outline of a course, including title, link, and all lesson titles.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "course_name": {
+                "type": "string",
+                "description": "The title of the course to get the outline for (e.g. 'MCP', 'Introduction')"
+            }
+        },
+        "required": ["course_name"]
+    }
+}
+_OUTLINE_TOOL_DEF = genai.types.Tool(function_declarations=[_GET_COURSE_OUTLINE_SCHEMA])
+
 
 class Tool(abc.ABC):
     """Abstract base class for all tools"""
@@ -18,93 +72,144 @@ class Tool(abc.ABC):
         pass
     
     @abc.abstractmethod
-    def execute(self, **kwargs) -> str:
-        """Execute the tool with given parameters"""
+    def execute(self, **kwargs) -> Tuple[str, List[dict]]:
+        """Execute the tool with given parameters.
+
+        Returns (result text, source dicts). Sources travel with the result
+        instead of through shared tool state, so concurrent requests cannot
+        observe each other's sources.
+        """
         pass
 
 
 class CourseSearchTool(Tool):
     """Tool for searching course content with semantic course name matching"""
-    
+
     def __init__(self, vector_store: vector_store.VectorStore):
         self.vector_store = vector_store
-        self.last_sources = []
 
     def get_tool_definition(self) -> genai.types.Tool:
         """Return Gemini tool definition for this tool"""
-        return genai.types.Tool(
-            function_declarations=[{
-                "name": "search_course_content",
-                "description": "Search course materials with smart course name matching and lesson filtering",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "query": {
-                            "type": "string", 
-                            "description": "What to search for in the course content"
-                        },
-                        "course_name": {
-                            "type": "string",
-                            "description": "Course title (partial matches work, e.g. 'MCP', 'Introduction')"
-                        },
-                        "lesson_number": {
-                            "type": "integer",
-                            "description": "Specific lesson number to search within (e.g. 1, 2, 3)"
-                        }
-                    },
-                    "required": ["query"]
-                }
-            }]
-        )
-    
-    def execute(self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None) -> str:
+        return _SEARCH_TOOL_DEF
+
+    def execute(self, query: str, course_name: Optional[str] = None, lesson_number: Optional[int] = None) -> Tuple[str, List[dict]]:
         """
         Execute the course search with the given query and optional filters.
-        
+
         Args:
             query: The search query string.
             course_name: Optional course name to filter results.
             lesson_number: Optional lesson number to filter results.
-            
+
         Returns:
-            A formatted string of search results.
+            A (formatted result string, source dicts) tuple.
         """
-        logger.info(f"Executing CourseSearchTool with query: '{query}', course_name: '{course_name}', lesson_number: '{lesson_number}'")
+        # %-style args defer formatting until a handler accepts the record
+        logger.info("Executing CourseSearchTool with query: %r, course_name: %r, lesson_number: %r",
+                    query, course_name, lesson_number)
         results = self.vector_store.search(query, course_name, lesson_number)
         return self._format_results(results)
 
-    def _format_results(self, results: vector_store.SearchResults) -> str:
+    def execute_batch(self, calls: List[dict]) -> List[Tuple[str, List[dict]]]:
+        """
+        Execute several searches at once, batching the embedding work.
+
+        All query strings are embedded in one forward pass regardless of how
+        the filters split them; calls sharing the same course/lesson filters
+        then share a single batched vector-store query, and distinct filter
+        groups hit Chroma concurrently.
+
+        Args:
+            calls: Keyword-argument dicts as accepted by execute.
+
+        Returns:
+            (formatted result, sources) tuples, one per call, in input order.
+        """
+        logger.info("Executing CourseSearchTool batch of %d searches", len(calls))
+        outputs: List[Optional[Tuple[str, List[dict]]]] = [None] * len(calls)
+
+        # One embedding pass over every query up front; the groups below
+        # reuse the vectors instead of re-embedding per filter group
+        query_vecs = self.vector_store.embed_queries([call['query'] for call in calls])
+
+        # Group same-filter calls; each group shares one Chroma query
+        groups = {}
+        for index, call in enumerate(calls):
+            key = (call.get('course_name'), call.get('lesson_number'))
+            groups.setdefault(key, []).append(index)
+
+        def run_group(course_name, lesson_number, indices):
+            if len(indices) == 1:
+                i = indices[0]
+                results_list = [self.vector_store.search(
+                    calls[i]['query'], course_name, lesson_number,
+                    query_vec=query_vecs[i]
+                )]
+            else:
+                results_list = self.vector_store.search_batch(
+                    [calls[i]['query'] for i in indices], course_name, lesson_number,
+                    query_vecs=[query_vecs[i] for i in indices]
+                )
+            return [(i, self._format_results(results))
+                    for i, results in zip(indices, results_list)]
+
+        if len(groups) == 1:
+            group_results = [run_group(course_name, lesson_number, indices)
+                             for (course_name, lesson_number), indices in groups.items()]
+        else:
+            # Independent filter groups are independent Chroma queries; run
+            # them on the pool instead of serially
+            futures = [
+                _GROUP_POOL.submit(run_group, course_name, lesson_number, indices)
+                for (course_name, lesson_number), indices in groups.items()
+            ]
+            group_results = [future.result() for future in futures]
+
+        for pairs in group_results:
+            for i, output in pairs:
+                outputs[i] = output
+
+        return outputs
+
+    def _format_results(self, results: vector_store.SearchResults) -> Tuple[str, List[dict]]:
         """Format search results with course and lesson context"""
-        formatted = []
-        sources = []  # Track sources for the UI
-        
-        for doc, meta in zip(results.documents, results.metadata):
-            course_title = meta.get('course_title', 'unknown')
-            lesson_num = meta.get('lesson_number')
-            lesson_link = meta.get('lesson_link')
-            
-            # Build context header
-            header = f"[{course_title}"
-            if lesson_num is not None:
-                header += f" - Lesson {lesson_num}"
-            header += "]"
-            
-            # Track source for the UI
-            source_text = course_title
-            if lesson_num is not None:
-                source_text += f" - Lesson {lesson_num}"
-            
-            sources.append({
-                "source": source_text,
-                "link": lesson_link
-            })
-            
-            formatted.append(f"{header}\n{doc}")
-        
-        # Store sources for retrieval
-        self.last_sources = sources
-        
-        return "\n\n".join(formatted)
+        # Fast path for empty results: skip the label/source/join work and
+        # surface the store's error message (e.g. "No course found matching
+        # ...") so the model can state it instead of receiving blank output
+        if not results.documents:
+            return results.error or "", []
+
+        # Build every context label in one pass over the result columns; it
+        # serves both the block header and the UI source entry. The SoA
+        # columns already carry defaults, so no per-row dict probes remain.
+        # Comprehensions keep the per-row interpreter work minimal — this
+        # runs inside every tool-using query. Result batches are almost
+        # always uniform (every chunk has a lesson number, or none do), so
+        # pick a branch-free comprehension for the whole batch where
+        # possible and keep the per-row conditional only for mixed batches.
+        lesson_numbers = results.lesson_numbers
+        if None not in lesson_numbers:
+            labels = [
+                f"{title} - Lesson {lesson_num}"
+                for title, lesson_num in zip(results.course_titles, lesson_numbers)
+            ]
+        elif all(lesson_num is None for lesson_num in lesson_numbers):
+            labels = results.course_titles
+        else:
+            labels = [
+                f"{title} - Lesson {lesson_num}" if lesson_num is not None else title
+                for title, lesson_num in zip(results.course_titles, lesson_numbers)
+            ]
+
+        sources = [
+            {"source": label, "link": link}
+            for label, link in zip(labels, results.lesson_links)
+        ]
+
+        formatted = "\n\n".join(
+            f"[{label}]\n{doc}" for label, doc in zip(labels, results.documents)
+        )
+        return formatted, sources
 
 
 class CourseOutlineTool(Tool):
@@ -112,27 +217,19 @@ class CourseOutlineTool(Tool):
 
     def __init__(self, vector_store: vector_store.VectorStore):
         self.vector_store = vector_store
+        # Outlines are static between ingestions, so cache the formatted
+        # result keyed on the normalized requested course name
+        self._outline_cache: dict = {}
+
+    def clear_outline_cache(self):
+        """Invalidate cached outlines after course data changes"""
+        self._outline_cache.clear()
 
     def get_tool_definition(self) -> genai.types.Tool:
         """Return Gemini tool definition for this tool"""
-        return genai.types.Tool(
-            function_declarations=[{
-                "name": "get_course_outline",
-                "description": "Get the outline of a course, including title, link, and all lesson titles.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "course_name": {
-                            "type": "string",
-                            "description": "The title of the course to get the outline for (e.g. 'MCP', 'Introduction')"
-                        }
-                    },
-                    "required": ["course_name"]
-                }
-            }]
-        )
+        return _OUTLINE_TOOL_DEF
 
-    def execute(self, course_name: str) -> str:
+    def execute(self, course_name: str) -> Tuple[str, List[dict]]:
         """
         Execute the course outline search.
 
@@ -140,40 +237,68 @@ class CourseOutlineTool(Tool):
             course_name: The course name to get the outline for.
 
         Returns:
-            A formatted string of the course outline.
+            A (formatted course outline, sources) tuple; outlines carry no
+            per-chunk sources, so the source list is always empty.
         """
-        import json
-        logger.info(f"Executing CourseOutlineTool with course_name: '{course_name}'")
+        logger.info("Executing CourseOutlineTool with course_name: %r", course_name)
+
+        # Serve repeat lookups from the cache, skipping the Chroma round-trip
+        # and JSON parse
+        cache_key = course_name.strip().lower()
+        cached = self._outline_cache.get(cache_key)
+        if cached is not None:
+            return cached, []
 
         # First, resolve the course name to get the exact title
         exact_course_title = self.vector_store._resolve_course_name(course_name)
         if not exact_course_title:
-            return f"Could not find a course named '{course_name}'."
+            return f"Could not find a course named '{course_name}'.", []
 
         # Get the course metadata from the course_catalog collection
         try:
             course_meta_results = self.vector_store.course_catalog.get(ids=[exact_course_title])
             if not course_meta_results or not course_meta_results['metadatas']:
-                return f"Could not retrieve metadata for course '{exact_course_title}'."
+                return f"Could not retrieve metadata for course '{exact_course_title}'.", []
         except Exception as e:
-            logger.error(f"Error fetching course metadata: {e}")
-            return "An error occurred while fetching course details."
+            logger.error("Error fetching course metadata: %s", e)
+            return "An error occurred while fetching course details.", []
 
         # Extract and format the outline
         metadata = course_meta_results['metadatas'][0]
         course_title = metadata.get('title', 'Unknown Course')
         course_link = metadata.get('course_link', 'Unknown Link')
+
+        # Prefer the pre-sorted compact listing written at ingestion: plain
+        # string splits, no JSON parse or sort on the read path
+        lessons_compact = metadata.get('lessons_compact')
+        if lessons_compact:
+            formatted = [
+                f"Course: {course_title}",
+                f"Link: {course_link}",
+                "Lessons:"
+            ]
+            for line in lessons_compact.split("\n"):
+                lesson_num, _, lesson_title = line.partition("|")
+                formatted.append(f"  - Lesson {lesson_num}: {lesson_title}")
+
+            outline = "\n".join(formatted)
+            self._outline_cache[cache_key] = outline
+            return outline, []
+
+        # Fall back to lessons_json for catalogs ingested before
+        # lessons_compact existed
         lessons_json = metadata.get('lessons_json')
 
         if not lessons_json:
-            return f"No lessons found for course '{course_title}'."
+            return f"No lessons found for course '{course_title}'.", []
 
         try:
-            lessons = json.loads(lessons_json)
+            # orjson's C parser is markedly faster than json for long lesson lists
+            lessons = orjson.loads(lessons_json)
             if not lessons:
-                return f"No lessons listed for course '{course_title}'."
-        except json.JSONDecodeError:
-            return "Error parsing lesson data."
+                return f"No lessons listed for course '{course_title}'.", []
+        except orjson.JSONDecodeError:
+            return "Error parsing lesson data.", []
 
         # Sort lessons by lesson number
         sorted_lessons = sorted(lessons, key=lambda x: x.get('lesson_number', 0))
@@ -189,49 +314,33 @@ class CourseOutlineTool(Tool):
             if lesson_num is not None and lesson_title:
                 formatted.append(f"  - Lesson {lesson_num}: {lesson_title}")
 
-        return "\n".join(formatted)
-
-    def _format_outline_from_results(self, results: vector_store.SearchResults) -> str:
-        """Format search results into a course outline."""
-        if not results.metadata:
-            return "Could not find an outline for the specified course."
-
-        # We can get course title and link from the first result's metadata
-        first_meta = results.metadata[0]
-        course_title = first_meta.get('course_title', 'Unknown Course')
-        course_link = first_meta.get('course_link', 'Unknown Link')
-
-        lessons = {}
-        for meta in results.metadata:
-            lesson_num = meta.get('lesson_number')
-            lesson_title = meta.get('lesson_title')
-            if lesson_num is not None and lesson_title is not None:
-                # Use a dict to store unique lessons
-                lessons[lesson_num] = lesson_title
-
-        if not lessons:
-            return f"No lessons found for course '{course_title}'."
-
-        # Sort lessons by lesson number
-        sorted_lessons = sorted(lessons.items())
-
-        formatted = [
-            f"Course: {course_title}",
-            f"Link: {course_link}",
-            "Lessons:"
-        ]
-        for lesson_num, lesson_title in sorted_lessons:
-            formatted.append(f"  - Lesson {lesson_num}: {lesson_title}")
-
-        return "\n".join(formatted)
-
+        outline = "\n".join(formatted)
+        self._outline_cache[cache_key] = outline
+        return outline, []
 
 class ToolManager:
     """Manages available tools for the AI"""
-    
+
+    # Result cache bounds: chat sessions often repeat identical tool calls
+    # across turns, and a hit skips the whole search-and-format path. The
+    # short TTL also limits staleness between ingestions.
+    RESULT_CACHE_MAX_ENTRIES = 1024
+    RESULT_CACHE_TTL_SECONDS = 300
+
     def __init__(self):
         self.tools = {}
-    
+        self._tool_definitions = None
+        # Dispatch table of bound execute methods, resolved at registration
+        # so each call is a single dict lookup with no attribute resolution
+        self._executors = {}
+        # Result cache keyed on (tool name, sorted kwargs): value is
+        # (result, sources, stored_at). Insertion order for FIFO eviction is
+        # kept in a deque of keys. Tool execution runs in worker threads, so
+        # the bookkeeping is guarded by a lock (as in ResponseCache).
+        self._result_cache = {}
+        self._result_cache_order = collections.deque()
+        self._result_cache_lock = threading.Lock()
+
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
         tool_def = tool.get_tool_definition()
@@ -239,29 +348,106 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._executors[tool_name] = tool.execute
+        # Invalidate the precomputed definition list
+        self._tool_definitions = None
 
-    
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Gemini tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
-    
-    def execute_tool(self, tool_name: str, **kwargs) -> str:
-        """Execute a tool by name with given parameters"""
-        if tool_name not in self.tools:
-            return f"Tool '{tool_name}' not found"
-        
-        return self.tools[tool_name].execute(**kwargs)
+        # Definitions are static per tool, so build the list once and reuse
+        # it on every request instead of rebuilding the schemas
+        if self._tool_definitions is None:
+            self._tool_definitions = [tool.get_tool_definition() for tool in self.tools.values()]
+        return self._tool_definitions
     
-    def get_last_sources(self) -> list:
-        """Get sources from the last search operation"""
-        # Check all tools for last_sources attribute
-        for tool in self.tools.values():
-            if hasattr(tool, 'last_sources') and tool.last_sources:
-                return tool.last_sources
-        return []
-
-    def reset_sources(self):
-        """Reset sources from all tools that track sources"""
-        for tool in self.tools.values():
-            if hasattr(tool, 'last_sources'):
-                tool.last_sources = []
\ No newline at end of file
+    @staticmethod
+    def _cache_key(tool_name: str, kwargs: dict) -> tuple:
+        """Build the result-cache key for a call"""
+        return (tool_name, tuple(sorted(kwargs.items())))
+
+    def _cache_get(self, key: tuple) -> Optional[Tuple[str, List[dict]]]:
+        """Return the cached (result, sources) for key, or None on a miss"""
+        with self._result_cache_lock:
+            cached = self._result_cache.get(key)
+            if cached is None:
+                return None
+            result, sources, stored_at = cached
+            if time.monotonic() - stored_at < self.RESULT_CACHE_TTL_SECONDS:
+                return result, list(sources)
+            # pop, not del: another thread may have raced the expiry
+            self._result_cache.pop(key, None)
+            return None
+
+    def _cache_put(self, key: tuple, result: str, sources: List[dict]):
+        """Store a computed (result, sources) under key, evicting FIFO"""
+        with self._result_cache_lock:
+            if len(self._result_cache) >= self.RESULT_CACHE_MAX_ENTRIES:
+                # FIFO eviction; keys already dropped by TTL expiry are skipped
+                while self._result_cache_order:
+                    oldest = self._result_cache_order.popleft()
+                    if self._result_cache.pop(oldest, None) is not None:
+                        break
+            self._result_cache[key] = (result, sources, time.monotonic())
+            self._result_cache_order.append(key)
+
+    def execute_tool(self, tool_name: str, **kwargs) -> Tuple[str, List[dict]]:
+        """Execute a tool by name, returning (result, sources) for the call"""
+        executor = self._executors.get(tool_name)
+        if executor is None:
+            return f"Tool '{tool_name}' not found", []
+
+        key = self._cache_key(tool_name, kwargs)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        result, sources = executor(**kwargs)
+        self._cache_put(key, result, sources)
+        return result, sources
+
+    def clear_result_cache(self):
+        """Invalidate cached tool results after course data changes"""
+        with self._result_cache_lock:
+            self._result_cache.clear()
+            self._result_cache_order.clear()
+
+    def execute_tools(self, calls: List[Tuple[str, dict]]) -> List[Tuple[str, List[dict]]]:
+        """
+        Execute several (tool_name, kwargs) calls, batching where supported.
+
+        Calls to a tool that implements execute_batch are handed over as one
+        batch; other tools run call-by-call. Every call goes through the
+        result cache — hits are served up front and misses populate it — so
+        repeats dedup the same way whether they arrive alone or in a batch.
+        (result, sources) tuples come back in input order.
+        """
+        outputs: List[Optional[Tuple[str, List[dict]]]] = [None] * len(calls)
+        keys = [self._cache_key(tool_name, kwargs) for tool_name, kwargs in calls]
+
+        by_tool = {}
+        for index, (tool_name, _) in enumerate(calls):
+            cached = self._cache_get(keys[index])
+            if cached is not None:
+                outputs[index] = cached
+                continue
+            by_tool.setdefault(tool_name, []).append(index)
+
+        for tool_name, indices in by_tool.items():
+            tool = self.tools.get(tool_name)
+            if tool is None:
+                for i in indices:
+                    outputs[i] = (f"Tool '{tool_name}' not found", [])
+                continue
+
+            if len(indices) > 1 and hasattr(tool, 'execute_batch'):
+                results = tool.execute_batch([calls[i][1] for i in indices])
+                for i, (result, sources) in zip(indices, results):
+                    outputs[i] = (result, sources)
+                    self._cache_put(keys[i], result, sources)
+            else:
+                for i in indices:
+                    result, sources = tool.execute(**calls[i][1])
+                    outputs[i] = (result, sources)
+                    self._cache_put(keys[i], result, sources)
+
+        return outputs
\ No newline at end of file
@@ -1,6 +1,6 @@
 from dataclasses import dataclass
 import logging
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -15,8 +15,11 @@ class Message:
 class SessionManager:
     """Manages conversation sessions and message history"""
     
-    def __init__(self, max_history: int = 5):
+    def __init__(self, max_history: int = 5, max_turns: int = 12,
+                 summarizer: Optional[Callable[[str], str]] = None):
         self.max_history = max_history
+        self.max_turns = max_turns
+        self.summarizer = summarizer
         self.sessions: Dict[str, List[Message]] = {}
         self.session_counter = 0
     
@@ -34,31 +37,62 @@ class SessionManager:
         
         message = Message(role=role, content=content)
         self.sessions[session_id].append(message)
-        
+
         # Keep conversation history within limits
-        if len(self.sessions[session_id]) > self.max_history * 2:
-            self.sessions[session_id] = self.sessions[session_id][-self.max_history * 2:]
+        self._compact_history(session_id)
+
+    def _compact_history(self, session_id: str):
+        """
+        Bound history size so prefill cost stays constant for long sessions.
+
+        Once a session exceeds max_turns messages, the newest max_history
+        exchanges are kept verbatim and everything older is folded into a
+        single summary message. The summary itself gets re-summarized on
+        later passes, so the history never grows past max_turns. Without a
+        summarizer, older messages are simply dropped.
+        """
+        messages = self.sessions[session_id]
+        if len(messages) <= self.max_turns:
+            return
+
+        keep_from = len(messages) - self.max_history * 2
+        older, recent = messages[:keep_from], messages[keep_from:]
+
+        if self.summarizer is not None:
+            transcript = "\n".join(f"{msg.role.title()}: {msg.content}" for msg in older)
+            try:
+                summary = self.summarizer(transcript)
+                note = Message(role="assistant", content=f"Summary of earlier conversation: {summary}")
+                self.sessions[session_id] = [note] + recent
+                return
+            except Exception as e:
+                logger.warning(f"History summarization failed, dropping oldest turns: {e}")
+
+        self.sessions[session_id] = recent
     
     def add_exchange(self, session_id: str, user_message: str, assistant_message: str):
         """Add a complete question-answer exchange"""
         self.add_message(session_id, "user", user_message)
         self.add_message(session_id, "assistant", assistant_message)
     
-    def get_conversation_history(self, session_id: Optional[str]) -> Optional[str]:
-        """Get formatted conversation history for a session"""
+    def get_conversation_history(self, session_id: Optional[str]) -> Optional[List[Dict]]:
+        """Get conversation history for a session as structured Gemini turns"""
         if not session_id or session_id not in self.sessions:
             return None
-        
+
         messages = self.sessions[session_id]
         if not messages:
             return None
-        
-        # Format messages for context
-        formatted_messages = []
-        for msg in messages:
-            formatted_messages.append(f"{msg.role.title()}: {msg.content}")
-        
-        return "\n".join(formatted_messages)
+
+        # Structured turns keep older history byte-identical across requests,
+        # so the stable prefix stays eligible for Gemini's implicit caching
+        return [
+            {
+                "role": "user" if msg.role == "user" else "model",
+                "parts": [{"text": msg.content}]
+            }
+            for msg in messages
+        ]
     
     def clear_session(self, session_id: str):
         """Clear all messages from a session"""
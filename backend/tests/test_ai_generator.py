@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 import pytest
@@ -10,7 +11,9 @@ import ai_generator
 @pytest.fixture
 def mock_genai_client():
     """Fixture to create a mock genai.Client."""
-    return mock.MagicMock()
+    client = mock.MagicMock()
+    client.aio.models.generate_content = mock.AsyncMock()
+    return client
 
 @pytest.fixture
 def mock_tool_manager():
@@ -32,12 +35,13 @@ def test_generate_response_direct_answer(ai_generator_instance, mock_genai_clien
     mock_response = mock.MagicMock()
     mock_response.text = "Paris"
     mock_response.candidates[0].content.parts = []
-    mock_genai_client.models.generate_content.return_value = mock_response
+    mock_genai_client.aio.models.generate_content.return_value = mock_response
 
-    response = ai_generator_instance.generate_response(query)
+    response, sources = asyncio.run(ai_generator_instance.generate_response(query))
 
     assert response == "Paris"
-    mock_genai_client.models.generate_content.assert_called_once()
+    assert sources == []
+    mock_genai_client.aio.models.generate_content.assert_called_once()
 
 def test_generate_response_single_tool_call(ai_generator_instance, mock_genai_client, mock_tool_manager):
     """Test that generate_response calls a tool and returns the final answer."""
@@ -60,12 +64,14 @@ def test_generate_response_single_tool_call(ai_generator_instance, mock_genai_cl
     mock_final_response.candidates[0].content.parts = []
     
     # Set up the mock client to return the two responses in order
-    mock_genai_client.models.generate_content.side_effect = [mock_initial_response, mock_final_response]
+    mock_genai_client.aio.models.generate_content.side_effect = [mock_initial_response, mock_final_response]
 
     # Mock the tool manager's execution result
-    mock_tool_manager.execute_tool.return_value = "Search results content"
+    mock_tool_manager.execute_tool.return_value = (
+        "Search results content", [{"source": "course1 - Lesson 1", "link": "link1"}]
+    )
 
-    response = ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager)
+    response, sources = asyncio.run(ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager))
 
     # Assert that the tool manager was called correctly
     mock_tool_manager.execute_tool.assert_called_once_with(
@@ -75,8 +81,10 @@ def test_generate_response_single_tool_call(ai_generator_instance, mock_genai_cl
     )
     
     # Assert that generate_content was called twice
-    assert mock_genai_client.models.generate_content.call_count == 2
+    assert mock_genai_client.aio.models.generate_content.call_count == 2
     assert response == "Here are the results for 'machine learning' in 'AI'."
+    # Sources returned by the tool travel back with the response
+    assert sources == [{"source": "course1 - Lesson 1", "link": "link1"}]
 
 def test_generate_response_two_sequential_tool_calls(ai_generator_instance, mock_genai_client, mock_tool_manager):
     """Test that generate_response can handle two sequential tool calls."""
@@ -107,13 +115,15 @@ def test_generate_response_two_sequential_tool_calls(ai_generator_instance, mock
     mock_final_response.text = "Comparison of neural networks..."
     mock_final_response.candidates[0].content.parts = []
 
-    mock_genai_client.models.generate_content.side_effect = [mock_response_1, mock_response_2, mock_final_response]
-    mock_tool_manager.execute_tool.side_effect = ["AI course content", "Deep Learning course content"]
+    mock_genai_client.aio.models.generate_content.side_effect = [mock_response_1, mock_response_2, mock_final_response]
+    mock_tool_manager.execute_tool.side_effect = [
+        ("AI course content", []), ("Deep Learning course content", [])
+    ]
 
-    response = ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager)
+    response, _ = asyncio.run(ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager))
 
     assert mock_tool_manager.execute_tool.call_count == 2
-    assert mock_genai_client.models.generate_content.call_count == 3
+    assert mock_genai_client.aio.models.generate_content.call_count == 3
     assert response == "Comparison of neural networks..."
 
 def test_generate_response_tool_failure(ai_generator_instance, mock_genai_client, mock_tool_manager):
@@ -129,11 +139,165 @@ def test_generate_response_tool_failure(ai_generator_instance, mock_genai_client
     mock_part.function_call = mock_function_call
     mock_response_with_tool.candidates[0].content.parts = [mock_part]
 
-    mock_genai_client.models.generate_content.return_value = mock_response_with_tool
+    mock_genai_client.aio.models.generate_content.return_value = mock_response_with_tool
     mock_tool_manager.execute_tool.side_effect = Exception("Tool failed!")
 
-    response = ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager)
+    response, _ = asyncio.run(ai_generator_instance.generate_response(query=query, tools=["search_course_content"], tool_manager=mock_tool_manager))
 
-    assert response == "An error occurred while executing the tool."
+    assert response == ai_generator.TOOL_ERROR_RESPONSE
     mock_tool_manager.execute_tool.assert_called_once()
-    mock_genai_client.models.generate_content.assert_called_once()
+    mock_genai_client.aio.models.generate_content.assert_called_once()
+
+def test_generate_response_uses_explicit_cache(ai_generator_instance, mock_genai_client):
+    """Test that generate_response references the explicit content cache when available."""
+    mock_cache = mock.MagicMock()
+    mock_cache.name = "cachedContents/abc"
+    mock_genai_client.aio.caches.create = mock.AsyncMock(return_value=mock_cache)
+
+    mock_response = mock.MagicMock()
+    mock_response.text = "Answer"
+    mock_response.candidates[0].content.parts = []
+    mock_genai_client.aio.models.generate_content.return_value = mock_response
+
+    response, _ = asyncio.run(ai_generator_instance.generate_response("q", tools=["search_course_content"]))
+
+    assert response == "Answer"
+    config = mock_genai_client.aio.models.generate_content.call_args.kwargs["config"]
+    assert config["cached_content"] == "cachedContents/abc"
+    assert "tools" not in config
+    assert "system_instruction" not in config
+
+    # A second call within the TTL reuses the cache without recreating it
+    asyncio.run(ai_generator_instance.generate_response("q2", tools=["search_course_content"]))
+    mock_genai_client.aio.caches.create.assert_awaited_once()
+
+async def _mock_stream(chunks):
+    """Helper async generator simulating a generate_content_stream response."""
+    for chunk in chunks:
+        yield chunk
+
+def _text_chunk(text):
+    """Build a mock streaming chunk carrying only text."""
+    chunk = mock.MagicMock()
+    chunk.text = text
+    part = mock.MagicMock()
+    part.function_call = None
+    chunk.candidates[0].content.parts = [part]
+    return chunk
+
+def test_generate_response_stream_direct_answer(ai_generator_instance, mock_genai_client):
+    """Test that generate_response_stream yields text deltas in order."""
+    chunks = [_text_chunk("Pa"), _text_chunk("ris")]
+    mock_genai_client.aio.models.generate_content_stream = mock.AsyncMock(
+        return_value=_mock_stream(chunks)
+    )
+
+    async def collect():
+        return [delta async for delta in ai_generator_instance.generate_response_stream("capital?")]
+
+    deltas = asyncio.run(collect())
+
+    assert deltas == ["Pa", "ris"]
+    mock_genai_client.aio.models.generate_content_stream.assert_awaited_once()
+
+def test_generate_response_stream_with_tool_call(ai_generator_instance, mock_genai_client, mock_tool_manager):
+    """Test that a tool round runs between streams and streaming resumes."""
+    mock_function_call = mock.MagicMock()
+    mock_function_call.name = "search_course_content"
+    mock_function_call.args = {"query": "machine learning"}
+    tool_part = mock.MagicMock()
+    tool_part.function_call = mock_function_call
+    tool_chunk = mock.MagicMock()
+    tool_chunk.text = None
+    tool_chunk.candidates[0].content.parts = [tool_part]
+
+    mock_genai_client.aio.models.generate_content_stream = mock.AsyncMock(
+        side_effect=[
+            _mock_stream([tool_chunk]),
+            _mock_stream([_text_chunk("Answer")]),
+        ]
+    )
+    mock_tool_manager.execute_tool.return_value = ("Search results content", [])
+
+    async def collect():
+        return [delta async for delta in ai_generator_instance.generate_response_stream(
+            "q", tools=["search_course_content"], tool_manager=mock_tool_manager)]
+
+    deltas = asyncio.run(collect())
+
+    assert deltas == ["Answer"]
+    mock_tool_manager.execute_tool.assert_called_once_with(
+        "search_course_content", query="machine learning"
+    )
+    assert mock_genai_client.aio.models.generate_content_stream.await_count == 2
+
+def test_generate_response_stream_accumulates_multi_chunk_tool_calls(ai_generator_instance, mock_genai_client, mock_tool_manager):
+    """Test that function calls split across stream chunks all execute."""
+    def tool_chunk(query, text=None):
+        call = mock.MagicMock()
+        call.name = "search_course_content"
+        call.args = {"query": query}
+        part = mock.MagicMock()
+        part.function_call = call
+        chunk = mock.MagicMock()
+        chunk.text = text
+        chunk.candidates[0].content.parts = [part]
+        return chunk
+
+    # One round delivered as two chunks, each carrying one function call;
+    # the first chunk also mixes in text
+    mock_genai_client.aio.models.generate_content_stream = mock.AsyncMock(
+        side_effect=[
+            _mock_stream([tool_chunk("first", text="Searching... "), tool_chunk("second")]),
+            _mock_stream([_text_chunk("Answer")]),
+        ]
+    )
+    mock_tool_manager.execute_tools.return_value = [
+        ("first results", []), ("second results", [])
+    ]
+
+    async def collect():
+        return [delta async for delta in ai_generator_instance.generate_response_stream(
+            "q", tools=["search_course_content"], tool_manager=mock_tool_manager)]
+
+    deltas = asyncio.run(collect())
+
+    # The mixed chunk's text passes through, then streaming resumes
+    assert deltas == ["Searching... ", "Answer"]
+    # Both calls were collected across chunks and executed as one batch
+    batched = mock_tool_manager.execute_tools.call_args.args[0]
+    assert [kwargs["query"] for _, kwargs in batched] == ["first", "second"]
+
+def test_generate_response_stream_exhausted_tool_rounds(ai_generator_instance, mock_genai_client, mock_tool_manager):
+    """Test that a final answer still streams when every round requests tools."""
+    def tool_chunk():
+        call = mock.MagicMock()
+        call.name = "search_course_content"
+        call.args = {"query": "more"}
+        part = mock.MagicMock()
+        part.function_call = call
+        chunk = mock.MagicMock()
+        chunk.text = None
+        chunk.candidates[0].content.parts = [part]
+        return chunk
+
+    # Every tool-capable round ends in a function call; the forced final
+    # generation must still stream the answer text
+    mock_genai_client.aio.models.generate_content_stream = mock.AsyncMock(
+        side_effect=[
+            _mock_stream([tool_chunk()])
+            for _ in range(ai_generator.AIGenerator.MAX_TOOL_ROUNDS)
+        ] + [_mock_stream([_text_chunk("Final answer")])]
+    )
+    mock_tool_manager.execute_tool.return_value = ("Search results content", [])
+
+    async def collect():
+        return [delta async for delta in ai_generator_instance.generate_response_stream(
+            "q", tools=["search_course_content"], tool_manager=mock_tool_manager)]
+
+    deltas = asyncio.run(collect())
+
+    assert deltas == ["Final answer"]
+    assert mock_tool_manager.execute_tool.call_count == ai_generator.AIGenerator.MAX_TOOL_ROUNDS
+    assert (mock_genai_client.aio.models.generate_content_stream.await_count
+            == ai_generator.AIGenerator.MAX_TOOL_ROUNDS + 1)
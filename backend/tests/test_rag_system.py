@@ -1,11 +1,14 @@
+import asyncio
 import sys
 import os
+import threading
 import pytest
 from unittest import mock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Mock config before importing RAGSystem
+import ai_generator
 import config
 mock_config = config.Config(GEMINI_API_KEY="test_key")
 
@@ -45,11 +48,15 @@ def test_query_with_session_id(rag_system):
     expected_sources = [{"source": "source1", "link": "link1"}]
 
     # Mock the return values of the components
-    rag_system.session_manager.get_conversation_history.return_value = "Previous conversation"
-    rag_system.ai_generator.generate_response.return_value = expected_answer
-    rag_system.tool_manager.get_last_sources.return_value = expected_sources
+    rag_system.session_manager.get_conversation_history.return_value = [
+        {"role": "user", "parts": [{"text": "Previous question"}]},
+        {"role": "model", "parts": [{"text": "Previous answer"}]}
+    ]
+    rag_system.ai_generator.generate_response = mock.AsyncMock(
+        return_value=(expected_answer, expected_sources)
+    )
 
-    answer, sources = rag_system.query(query, session_id)
+    answer, sources = asyncio.run(rag_system.query(query, session_id))
 
     assert answer == expected_answer
     assert sources == expected_sources
@@ -57,7 +64,6 @@ def test_query_with_session_id(rag_system):
     # Verify that the correct methods were called
     rag_system.session_manager.get_conversation_history.assert_called_once_with(session_id)
     rag_system.ai_generator.generate_response.assert_called_once()
-    rag_system.tool_manager.get_last_sources.assert_called_once()
     rag_system.session_manager.add_exchange.assert_called_once_with(session_id, query, expected_answer)
 
 def test_query_without_session_id(rag_system):
@@ -67,10 +73,11 @@ def test_query_without_session_id(rag_system):
     expected_sources = []
 
     # Mock the return values
-    rag_system.ai_generator.generate_response.return_value = expected_answer
-    rag_system.tool_manager.get_last_sources.return_value = expected_sources
+    rag_system.ai_generator.generate_response = mock.AsyncMock(
+        return_value=(expected_answer, expected_sources)
+    )
 
-    answer, sources = rag_system.query(query)
+    answer, sources = asyncio.run(rag_system.query(query))
 
     assert answer == expected_answer
     assert sources == expected_sources
@@ -97,3 +104,57 @@ def test_add_course_document(rag_system):
     rag_system.document_processor.process_course_document.assert_called_once_with(file_path)
     rag_system.vector_store.add_course_metadata.assert_called_once_with(mock_course)
     rag_system.vector_store.add_course_content.assert_called_once_with(mock_chunks)
+
+def test_query_coalesces_identical_inflight_requests(rag_system):
+    """Test that duplicate concurrent queries share one generation."""
+    query = "test query"
+    expected_answer = "This is a test answer."
+
+    async def slow_generate(**kwargs):
+        await asyncio.sleep(0.01)
+        return expected_answer, []
+
+    rag_system.ai_generator.generate_response = mock.AsyncMock(side_effect=slow_generate)
+
+    async def run_both():
+        return await asyncio.gather(
+            rag_system.query(query),
+            rag_system.query(query)
+        )
+
+    first, second = asyncio.run(run_both())
+
+    assert first == second == (expected_answer, [])
+    # The duplicate awaited the in-flight future instead of generating again
+    rag_system.ai_generator.generate_response.assert_awaited_once()
+
+def test_query_persists_history_off_event_loop(rag_system):
+    """Test that history persistence (and its compaction) cannot block the loop."""
+    rag_system.ai_generator.generate_response = mock.AsyncMock(return_value=("answer", []))
+    rag_system.session_manager.get_conversation_history.return_value = None
+
+    # add_exchange may run a synchronous summarization when the session
+    # compacts, so it must execute on a worker thread, not the loop thread
+    exchange_threads = []
+    rag_system.session_manager.add_exchange = (
+        lambda *args: exchange_threads.append(threading.current_thread())
+    )
+
+    loop_thread = threading.current_thread()
+    asyncio.run(rag_system.query("q", "test_session"))
+
+    assert exchange_threads
+    assert exchange_threads[0] is not loop_thread
+
+def test_query_does_not_cache_error_responses(rag_system):
+    """Test that the tool-failure fallback answer is never cached."""
+    rag_system.response_cache = mock.MagicMock()
+    rag_system.response_cache.get.return_value = None
+    rag_system.ai_generator.generate_response = mock.AsyncMock(
+        return_value=(ai_generator.TOOL_ERROR_RESPONSE, [])
+    )
+
+    answer, _ = asyncio.run(rag_system.query("test query"))
+
+    assert answer == ai_generator.TOOL_ERROR_RESPONSE
+    rag_system.response_cache.put.assert_not_called()
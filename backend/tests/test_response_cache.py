@@ -0,0 +1,73 @@
+import sys
+import os
+import json
+import pytest
+from unittest import mock
+
+# Add backend to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import response_cache
+
+@pytest.fixture
+def mock_collection():
+    """Fixture for the mocked query_cache collection."""
+    return mock.MagicMock()
+
+@pytest.fixture
+def cache(mock_collection):
+    """Fixture to create a ResponseCache backed by a mock collection."""
+    mock_vector_store = mock.MagicMock()
+    mock_vector_store.client.get_or_create_collection.return_value = mock_collection
+    return response_cache.ResponseCache(mock_vector_store)
+
+def test_exact_match_fast_path(cache, mock_collection):
+    """Test that a repeated query is served from the exact-match dict."""
+    cache.put("what is MCP?", "An answer", [{"source": "s", "link": "l"}])
+
+    result = cache.get("what is MCP?")
+
+    assert result == ("An answer", [{"source": "s", "link": "l"}])
+    # Served without touching the semantic collection
+    mock_collection.query.assert_not_called()
+
+def test_semantic_hit_within_threshold(cache, mock_collection):
+    """Test that a near-duplicate query is served from the semantic index."""
+    mock_collection.query.return_value = {
+        'ids': [["q_1"]],
+        'distances': [[0.01]],
+        'metadatas': [[{"answer": "An answer", "sources": json.dumps([])}]]
+    }
+
+    result = cache.get("what is the MCP protocol?")
+
+    assert result == ("An answer", [])
+
+def test_semantic_miss_beyond_threshold(cache, mock_collection):
+    """Test that a dissimilar query is not served from the cache."""
+    mock_collection.query.return_value = {
+        'ids': [["q_1"]],
+        'distances': [[0.5]],
+        'metadatas': [[{"answer": "An answer", "sources": json.dumps([])}]]
+    }
+
+    assert cache.get("unrelated question") is None
+
+def test_miss_on_empty_cache(cache, mock_collection):
+    """Test that an empty semantic index yields a miss."""
+    mock_collection.query.return_value = {'ids': [[]], 'distances': [[]], 'metadatas': [[]]}
+
+    assert cache.get("anything") is None
+
+def test_expired_entries_are_not_served(cache, mock_collection):
+    """Test that entries older than the TTL miss on both paths."""
+    with mock.patch.object(response_cache.time, "monotonic", return_value=0.0):
+        cache.put("old question", "Old answer", [])
+    mock_collection.query.return_value = {
+        'ids': [["q_1"]],
+        'distances': [[0.0]],
+        'metadatas': [[{"answer": "Old answer", "sources": json.dumps([]), "stored_at": 0.0}]]
+    }
+
+    with mock.patch.object(response_cache.time, "monotonic", return_value=cache.TTL_SECONDS + 1.0):
+        assert cache.get("old question") is None
@@ -25,18 +25,20 @@ def test_execute_with_query_only(course_search_tool, mock_vector_store):
     
     mock_vector_store.search.return_value = vector_store.SearchResults(
         documents=["doc1"],
-        metadata=[{"course_title": "course1", "lesson_number": 1, "lesson_link": "link1"}],
+        course_titles=["course1"],
+        lesson_numbers=[1],
+        lesson_links=["link1"],
         distances=[0.1]
     )
 
-    result = course_search_tool.execute(query=query)
+    result, sources = course_search_tool.execute(query=query)
 
     mock_vector_store.search.assert_called_once_with(query, None, None)
     assert "course1" in result
     assert "Lesson 1" in result
     assert "doc1" in result
-    assert len(course_search_tool.last_sources) == 1
-    assert course_search_tool.last_sources[0]["source"] == "course1 - Lesson 1"
+    assert len(sources) == 1
+    assert sources[0]["source"] == "course1 - Lesson 1"
 
 def test_execute_with_course_name(course_search_tool, mock_vector_store):
     """Test that execute calls vector_store.search with a query and course_name."""
@@ -45,7 +47,9 @@ def test_execute_with_course_name(course_search_tool, mock_vector_store):
     
     mock_vector_store.search.return_value = vector_store.SearchResults(
         documents=["doc1"],
-        metadata=[{"course_title": "course1", "lesson_number": 1, "lesson_link": "link1"}],
+        course_titles=["course1"],
+        lesson_numbers=[1],
+        lesson_links=["link1"],
         distances=[0.1]
     )
 
@@ -60,7 +64,9 @@ def test_execute_with_lesson_number(course_search_tool, mock_vector_store):
 
     mock_vector_store.search.return_value = vector_store.SearchResults(
         documents=["doc1"],
-        metadata=[{"course_title": "course1", "lesson_number": 1, "lesson_link": "link1"}],
+        course_titles=["course1"],
+        lesson_numbers=[1],
+        lesson_links=["link1"],
         distances=[0.1]
     )
 
@@ -72,21 +78,21 @@ def test_format_results(course_search_tool):
     """Test the _format_results method directly."""
     results = vector_store.SearchResults(
         documents=["doc1", "doc2"],
-        metadata=[
-            {"course_title": "course1", "lesson_number": 1, "lesson_link": "link1"},
-            {"course_title": "course2", "lesson_number": 2, "lesson_link": "link2"}
-        ],
+        course_titles=["course1", "course2"],
+        lesson_numbers=[1, 2],
+        lesson_links=["link1", "link2"],
         distances=[0.1, 0.2]
     )
 
-    formatted_string = course_search_tool._format_results(results)
-    
+    formatted_string, sources = course_search_tool._format_results(results)
+
     expected_string = "[course1 - Lesson 1]\ndoc1\n\n[course2 - Lesson 2]\ndoc2"
     assert formatted_string == expected_string
-    
-    assert len(course_search_tool.last_sources) == 2
-    assert course_search_tool.last_sources[0] == {"source": "course1 - Lesson 1", "link": "link1"}
-    assert course_search_tool.last_sources[1] == {"source": "course2 - Lesson 2", "link": "link2"}
+
+    assert sources == [
+        {"source": "course1 - Lesson 1", "link": "link1"},
+        {"source": "course2 - Lesson 2", "link": "link2"}
+    ]
 
 def test_execute_with_no_results(course_search_tool, mock_vector_store):
     """Test execute when the vector store returns no results."""
@@ -94,7 +100,141 @@ def test_execute_with_no_results(course_search_tool, mock_vector_store):
     
     mock_vector_store.search.return_value = vector_store.SearchResults.empty("No results found")
 
-    result = course_search_tool.execute(query=query)
+    result, sources = course_search_tool.execute(query=query)
+
+    # The store's error message is surfaced so the model can report it
+    assert result == "No results found"
+    assert sources == []
+
+def test_execute_batch_groups_same_filter_calls(course_search_tool, mock_vector_store):
+    """Test that same-filter calls share one batched vector-store query."""
+    mock_vector_store.search_batch.return_value = [
+        vector_store.SearchResults(
+            documents=["doc1"],
+            course_titles=["course1"],
+            lesson_numbers=[1],
+            lesson_links=["link1"],
+            distances=[0.1]
+        ),
+        vector_store.SearchResults(
+            documents=["doc2"],
+            course_titles=["course1"],
+            lesson_numbers=[2],
+            lesson_links=["link2"],
+            distances=[0.2]
+        )
+    ]
+
+    results = course_search_tool.execute_batch([
+        {"query": "first"},
+        {"query": "second"}
+    ])
+
+    mock_vector_store.embed_queries.assert_called_once_with(["first", "second"])
+    call = mock_vector_store.search_batch.call_args
+    assert call.args == (["first", "second"], None, None)
+    assert "query_vecs" in call.kwargs
+    assert "doc1" in results[0][0]
+    assert "doc2" in results[1][0]
+
+def test_execute_batch_single_call_uses_search(course_search_tool, mock_vector_store):
+    """Test that a lone call per filter group issues a plain search."""
+    mock_vector_store.search.return_value = vector_store.SearchResults(
+        documents=["doc1"],
+        course_titles=["course1"],
+        lesson_numbers=[1],
+        lesson_links=["link1"],
+        distances=[0.1]
+    )
+
+    results = course_search_tool.execute_batch([{"query": "only", "course_name": "course1"}])
+
+    call = mock_vector_store.search.call_args
+    assert call.args == ("only", "course1", None)
+    # The shared embedding pass supplies the query vector
+    assert "query_vec" in call.kwargs
+    mock_vector_store.search_batch.assert_not_called()
+    assert "doc1" in results[0][0]
+
+def test_execute_batch_embeds_once_across_filter_groups(course_search_tool, mock_vector_store):
+    """Test that mixed-filter batches still share one embedding pass."""
+    mock_vector_store.search.return_value = vector_store.SearchResults.empty("No results found")
+
+    results = course_search_tool.execute_batch([
+        {"query": "a", "course_name": "course1"},
+        {"query": "b", "course_name": "course2"}
+    ])
+
+    mock_vector_store.embed_queries.assert_called_once_with(["a", "b"])
+    # Each filter group still gets its own Chroma query
+    assert mock_vector_store.search.call_count == 2
+    assert len(results) == 2
+
+def test_tool_manager_execute_tools_batches_search(course_search_tool, mock_vector_store):
+    """Test that ToolManager routes multi-call turns through execute_batch."""
+    manager = search_tools.ToolManager()
+    manager.register_tool(course_search_tool)
+
+    mock_vector_store.search_batch.return_value = [
+        vector_store.SearchResults.empty("No results found"),
+        vector_store.SearchResults.empty("No results found")
+    ]
+
+    outputs = manager.execute_tools([
+        ("search_course_content", {"query": "a"}),
+        ("search_course_content", {"query": "b"}),
+        ("missing_tool", {"query": "c"})
+    ])
+
+    call = mock_vector_store.search_batch.call_args
+    assert call.args == (["a", "b"], None, None)
+    assert outputs[2] == ("Tool 'missing_tool' not found", [])
+
+def test_tool_manager_caches_identical_calls(course_search_tool, mock_vector_store):
+    """Test that repeated identical tool calls are served from the result cache."""
+    manager = search_tools.ToolManager()
+    manager.register_tool(course_search_tool)
+
+    mock_vector_store.search.return_value = vector_store.SearchResults(
+        documents=["doc1"],
+        course_titles=["course1"],
+        lesson_numbers=[1],
+        lesson_links=["link1"],
+        distances=[0.1]
+    )
+
+    first = manager.execute_tool("search_course_content", query="test")
+    second = manager.execute_tool("search_course_content", query="test")
+
+    mock_vector_store.search.assert_called_once()
+    assert second == first
+    # Sources come back with the cached result
+    assert second[1][0]["source"] == "course1 - Lesson 1"
+
+    manager.clear_result_cache()
+    manager.execute_tool("search_course_content", query="test")
+    assert mock_vector_store.search.call_count == 2
+
+def test_execute_tools_uses_result_cache(course_search_tool, mock_vector_store):
+    """Test that batched turns consult and populate the result cache."""
+    manager = search_tools.ToolManager()
+    manager.register_tool(course_search_tool)
+
+    mock_vector_store.search.return_value = vector_store.SearchResults.empty("No results found")
+
+    first = manager.execute_tool("search_course_content", query="repeat")
+    assert mock_vector_store.search.call_count == 1
+
+    outputs = manager.execute_tools([
+        ("search_course_content", {"query": "repeat"}),
+        ("search_course_content", {"query": "fresh"})
+    ])
+
+    # The repeated call is served from the cache; only "fresh" hits the store
+    assert outputs[0] == first
+    assert mock_vector_store.search.call_count == 2
+    mock_vector_store.search_batch.assert_not_called()
 
-    assert result == ""
-    assert len(course_search_tool.last_sources) == 0
+    # The batch path also populated the cache for the call it executed
+    manager.execute_tools([("search_course_content", {"query": "fresh"})])
+    assert mock_vector_store.search.call_count == 2
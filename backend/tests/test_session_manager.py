@@ -0,0 +1,69 @@
+import sys
+import os
+import pytest
+from unittest import mock
+
+# Add backend to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import session_manager
+
+@pytest.fixture
+def mock_summarizer():
+    """Fixture for a summarizer callable."""
+    return mock.MagicMock(return_value="Earlier topics recap")
+
+@pytest.fixture
+def manager(mock_summarizer):
+    """Fixture for a SessionManager with a small window and mock summarizer."""
+    return session_manager.SessionManager(max_history=2, max_turns=6, summarizer=mock_summarizer)
+
+def test_history_below_cap_is_untouched(manager, mock_summarizer):
+    """Test that short histories are kept verbatim."""
+    session_id = manager.create_session()
+    for i in range(3):
+        manager.add_exchange(session_id, f"q{i}", f"a{i}")
+
+    assert len(manager.sessions[session_id]) == 6
+    mock_summarizer.assert_not_called()
+
+def test_older_turns_are_summarized(manager, mock_summarizer):
+    """Test that exceeding max_turns folds older messages into a summary."""
+    session_id = manager.create_session()
+    for i in range(4):
+        manager.add_exchange(session_id, f"q{i}", f"a{i}")
+
+    messages = manager.sessions[session_id]
+    # Oldest turns were folded into a single summary note
+    assert len(messages) < 8
+    assert messages[0].role == "assistant"
+    assert messages[0].content == "Summary of earlier conversation: Earlier topics recap"
+    assert messages[-1].content == "a3"
+    mock_summarizer.assert_called_once()
+
+def test_summarizer_failure_falls_back_to_truncation(mock_summarizer):
+    """Test that a failing summarizer degrades to dropping oldest turns."""
+    mock_summarizer.side_effect = Exception("model unavailable")
+    manager = session_manager.SessionManager(max_history=2, max_turns=6, summarizer=mock_summarizer)
+
+    session_id = manager.create_session()
+    for i in range(4):
+        manager.add_exchange(session_id, f"q{i}", f"a{i}")
+
+    messages = manager.sessions[session_id]
+    # Oldest turns were dropped, newest kept verbatim
+    assert len(messages) < 8
+    assert messages[0].content == "a1"
+    assert messages[-1].content == "a3"
+
+def test_structured_history_roles(manager):
+    """Test that get_conversation_history maps roles to Gemini turns."""
+    session_id = manager.create_session()
+    manager.add_exchange(session_id, "question", "answer")
+
+    history = manager.get_conversation_history(session_id)
+
+    assert history == [
+        {"role": "user", "parts": [{"text": "question"}]},
+        {"role": "model", "parts": [{"text": "answer"}]}
+    ]
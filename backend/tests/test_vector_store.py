@@ -0,0 +1,60 @@
+import sys
+import os
+import pytest
+from unittest import mock
+
+# Add backend to sys.path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import vector_store
+
+@pytest.fixture
+def store():
+    """Fixture for a VectorStore with mocked Chroma client and embedder."""
+    with mock.patch('vector_store.chromadb.PersistentClient'), \
+         mock.patch('vector_store.chromadb.utils.embedding_functions.SentenceTransformerEmbeddingFunction'):
+        vs = vector_store.VectorStore("/tmp/chroma", "test-model", max_results=2)
+    vs.course_content = mock.MagicMock()
+    return vs
+
+def test_search_reranks_overfetched_candidates(store):
+    """Test that the exact re-rank reorders ANN candidates and truncates."""
+    # Query vector aligned with the x axis
+    store.embedding_function = mock.MagicMock(return_value=[[1.0, 0.0]])
+    # ANN stage returns candidates in imperfect order: doc2 is the best match
+    store.course_content.query.return_value = {
+        'documents': [["doc1", "doc2", "doc3"]],
+        'metadatas': [[{"course_title": "c1"}, {"course_title": "c2"}, {"course_title": "c3"}]],
+        'distances': [[0.1, 0.2, 0.3]],
+        'embeddings': [[[0.5, 0.5], [1.0, 0.0], [0.0, 1.0]]]
+    }
+
+    results = store.search("query")
+
+    assert results.documents == ["doc2", "doc1"]
+    assert results.course_titles == ["c2", "c1"]
+    # Overfetched 3x the requested limit from the ANN stage
+    assert store.course_content.query.call_args.kwargs["n_results"] == 2 * store.OVERFETCH
+
+def test_search_without_embeddings_keeps_ann_order(store):
+    """Test the fallback when candidate embeddings are unavailable."""
+    store.embedding_function = mock.MagicMock(return_value=[[1.0, 0.0]])
+    store.course_content.query.return_value = {
+        'documents': [["doc1", "doc2", "doc3"]],
+        'metadatas': [[{}, {}, {}]],
+        'distances': [[0.1, 0.2, 0.3]],
+        'embeddings': None
+    }
+
+    results = store.search("query")
+
+    assert results.documents == ["doc1", "doc2"]
+
+def test_search_returns_error_results_on_failure(store):
+    """Test that query failures surface as empty SearchResults with error."""
+    store.embedding_function = mock.MagicMock(side_effect=Exception("boom"))
+
+    results = store.search("query")
+
+    assert results.is_empty()
+    assert "Search error" in results.error
@@ -1,32 +1,51 @@
+import sys
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional
 
 import chromadb
+import numpy as np
+
 import models
 
 
 @dataclass
 class SearchResults:
-    """Container for search results with metadata"""
+    """Container for search results as parallel columns.
+
+    Holding one list per field instead of a list of metadata dicts means
+    consumers iterate plain sequences rather than doing a hash probe per
+    field per row.
+    """
     documents: List[str]
-    metadata: List[Dict[str, Any]]
+    course_titles: List[str]
+    lesson_numbers: List[Optional[int]]
+    lesson_links: List[Optional[str]]
     distances: List[float]
     error: Optional[str] = None
-    
+
     @classmethod
     def from_chroma(cls, chroma_results: Dict) -> 'SearchResults':
         """Create SearchResults from ChromaDB query results"""
+        metadatas = chroma_results['metadatas'][0] if chroma_results['metadatas'] else []
+        # Titles and links repeat across every chunk of a course; interning
+        # collapses them to one shared string per distinct value, so
+        # downstream comparisons are pointer checks and duplicates cost no
+        # extra memory
         return cls(
             documents=chroma_results['documents'][0] if chroma_results['documents'] else [],
-            metadata=chroma_results['metadatas'][0] if chroma_results['metadatas'] else [],
+            course_titles=[sys.intern(meta.get('course_title', 'unknown')) for meta in metadatas],
+            lesson_numbers=[meta.get('lesson_number') for meta in metadatas],
+            lesson_links=[sys.intern(meta['lesson_link']) if meta.get('lesson_link') else None
+                          for meta in metadatas],
             distances=chroma_results['distances'][0] if chroma_results['distances'] else []
         )
-    
+
     @classmethod
     def empty(cls, error_msg: str) -> 'SearchResults':
         """Create empty results with error message"""
-        return cls(documents=[], metadata=[], distances=[], error=error_msg)
-    
+        return cls(documents=[], course_titles=[], lesson_numbers=[],
+                   lesson_links=[], distances=[], error=error_msg)
+
     def is_empty(self) -> bool:
         """Check if results are empty"""
         return len(self.documents) == 0
@@ -34,9 +53,32 @@ class SearchResults:
 class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
     
+    # HNSW tuning for the indexes: higher M/construction_ef buys graph
+    # quality at build time, search_ef trades recall for query speed.
+    # Applied when a collection is first created; existing collections keep
+    # the parameters they were built with.
+    #
+    # Note on quantization: Chroma's local HNSW segment stores fp32 vectors
+    # and exposes no scalar-quantization (SQ8) or half-precision knob, so
+    # shrinking the embedding matrix in place isn't possible without
+    # replacing the store. The exact re-rank in _rerank already plays the
+    # role of an fp32 refine pass over the ANN stage's candidates.
+    HNSW_PARAMS = {
+        "hnsw:M": 32,
+        "hnsw:construction_ef": 200,
+        "hnsw:search_ef": 100
+    }
+
+    # Candidates fetched from the ANN stage per requested result; the exact
+    # re-rank then selects the final top-k from this wider pool
+    OVERFETCH = 3
+
     def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
         self.max_results = max_results
-        # Initialize ChromaDB client
+        # Initialize ChromaDB client. PersistentClient keeps the HNSW graph
+        # and vectors on disk under chroma_path, so process restarts reload
+        # the built index instead of re-embedding and re-inserting chunks —
+        # add_course_folder then skips already-ingested courses entirely.
         self.client = chromadb.PersistentClient(
             path=chroma_path,
             settings=chromadb.config.Settings(anonymized_telemetry=False),
@@ -52,17 +94,23 @@ class VectorStore:
         self.course_content = self._create_collection("course_content")  # Actual course material
     
     def _create_collection(self, name: str):
-        """Create or get a ChromaDB collection"""
+        """Create or get a ChromaDB collection with tuned HNSW parameters"""
         return self.client.get_or_create_collection(
             name=name,
-            embedding_function=self.embedding_function
+            embedding_function=self.embedding_function,
+            metadata=dict(self.HNSW_PARAMS)
         )
     
+    def embed_queries(self, queries: List[str]) -> List:
+        """Embed several query strings in one model forward pass"""
+        return self.embedding_function(list(queries))
+
     def search(self, 
                query: str,
                course_name: Optional[str] = None,
                lesson_number: Optional[int] = None,
-               limit: Optional[int] = None) -> SearchResults:
+               limit: Optional[int] = None,
+               query_vec=None) -> SearchResults:
         """
         Main search interface that handles course resolution and content search.
         
@@ -71,6 +119,8 @@ class VectorStore:
             course_name: Optional course name/title to filter by
             lesson_number: Optional lesson number to filter by
             limit: Maximum results to return
+            query_vec: Optional precomputed embedding of query, so callers
+                batching several searches can share one embedding pass
             
         Returns:
             SearchResults object with documents and metadata
@@ -88,16 +138,117 @@ class VectorStore:
         # Step 3: Search course content
         # Use provided limit or fall back to configured max_results
         search_limit = limit if limit is not None else self.max_results
-        
+
+        # Two-stage retrieval: the approximate HNSW stage overfetches, then
+        # an exact cosine re-rank against the candidates' fp32 embeddings
+        # picks the final top-k, restoring recall lost to the ANN stage.
         try:
+            # Embed once and reuse the vector for the re-rank
+            if query_vec is None:
+                query_vec = self.embedding_function([query])[0]
             results = self.course_content.query(
-                query_texts=[query],
-                n_results=search_limit,
-                where=filter_dict
+                query_embeddings=[query_vec],
+                n_results=search_limit * self.OVERFETCH,
+                where=filter_dict,
+                include=["documents", "metadatas", "distances", "embeddings"]
             )
-            return SearchResults.from_chroma(results)
+            return self._rerank(query_vec, results, search_limit)
         except Exception as e:
             return SearchResults.empty(f"Search error: {str(e)}")
+
+    def search_batch(self,
+                     queries: List[str],
+                     course_name: Optional[str] = None,
+                     lesson_number: Optional[int] = None,
+                     limit: Optional[int] = None,
+                     query_vecs: Optional[List] = None) -> List[SearchResults]:
+        """
+        Search course content for several queries sharing the same filters.
+
+        All queries are embedded in one forward pass and answered by a single
+        Chroma query, amortizing the per-call overhead across the batch.
+
+        Args:
+            queries: Search query strings
+            course_name: Optional course name/title to filter by
+            lesson_number: Optional lesson number to filter by
+            limit: Maximum results to return per query
+            query_vecs: Optional precomputed embeddings for the queries
+
+        Returns:
+            One SearchResults per query, in input order
+        """
+        course_title = None
+        if course_name:
+            course_title = self._resolve_course_name(course_name)
+            if not course_title:
+                return [SearchResults.empty(f"No course found matching '{course_name}'")
+                        for _ in queries]
+
+        filter_dict = self._build_filter(course_title, lesson_number)
+        search_limit = limit if limit is not None else self.max_results
+
+        try:
+            if query_vecs is None:
+                query_vecs = self.embedding_function(list(queries))
+            results = self.course_content.query(
+                query_embeddings=query_vecs,
+                n_results=search_limit * self.OVERFETCH,
+                where=filter_dict,
+                include=["documents", "metadatas", "distances", "embeddings"]
+            )
+
+            embeddings = results.get('embeddings')
+            batched = []
+            for i, query_vec in enumerate(query_vecs):
+                per_query = {
+                    'documents': [results['documents'][i]],
+                    'metadatas': [results['metadatas'][i]],
+                    'distances': [results['distances'][i]],
+                    'embeddings': [embeddings[i]] if embeddings is not None else None
+                }
+                batched.append(self._rerank(query_vec, per_query, search_limit))
+            return batched
+        except Exception as e:
+            return [SearchResults.empty(f"Search error: {str(e)}") for _ in queries]
+
+    def _rerank(self, query_vec, chroma_results: Dict, limit: int) -> SearchResults:
+        """Exact re-rank of overfetched ANN candidates, truncated to limit"""
+        results = SearchResults.from_chroma(chroma_results)
+        if len(results.documents) <= limit:
+            return results
+
+        embeddings = chroma_results.get('embeddings')
+        candidates = embeddings[0] if embeddings is not None and len(embeddings) else None
+        if candidates is None or len(candidates) != len(results.documents):
+            # Embeddings unavailable — keep the ANN ordering
+            return SearchResults(
+                documents=results.documents[:limit],
+                course_titles=results.course_titles[:limit],
+                lesson_numbers=results.lesson_numbers[:limit],
+                lesson_links=results.lesson_links[:limit],
+                distances=results.distances[:limit]
+            )
+
+        # C-contiguous fp32 lets the BLAS dot run its SIMD kernels directly,
+        # with no internal copy or dtype conversion
+        candidates = np.ascontiguousarray(candidates, dtype=np.float32)
+        query_arr = np.ascontiguousarray(query_vec, dtype=np.float32)
+        norms = np.linalg.norm(candidates, axis=1) * np.linalg.norm(query_arr) + 1e-12
+        similarities = candidates @ query_arr / norms
+        # Partial selection: argpartition picks the top-k in O(n), then only
+        # those k rows are sorted, instead of argsorting the whole
+        # overfetched pool
+        top = np.argpartition(-similarities, limit - 1)[:limit]
+        order = top[np.argsort(-similarities[top])]
+
+        return SearchResults(
+            documents=[results.documents[i] for i in order],
+            course_titles=[results.course_titles[i] for i in order],
+            lesson_numbers=[results.lesson_numbers[i] for i in order],
+            lesson_links=[results.lesson_links[i] for i in order],
+            distances=[float(1.0 - similarities[i]) for i in order]
+        )
     
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
         """Use vector search to find best matching course by name"""
@@ -147,6 +298,13 @@ class VectorStore:
                 "lesson_link": lesson.lesson_link
             })
         
+        # Pre-sorted "number|title" lines so outline reads need no JSON parse
+        # or sort
+        lessons_compact = "\n".join(
+            f"{lesson.lesson_number}|{lesson.title}"
+            for lesson in sorted(course.lessons, key=lambda l: l.lesson_number)
+        )
+
         self.course_catalog.add(
             documents=[course_text],
             metadatas=[{
@@ -154,31 +312,40 @@ class VectorStore:
                 "instructor": course.instructor,
                 "course_link": course.course_link,
                 "lessons_json": json.dumps(lessons_metadata),  # Serialize as JSON string
+                "lessons_compact": lessons_compact,
                 "lesson_count": len(course.lessons)
             }],
             ids=[course.title]
         )
     
+    # Chunks per insert; large batches let the embedding model encode many
+    # texts per forward pass while staying under Chroma's insert limit
+    EMBED_BATCH_SIZE = 500
+
     def add_course_content(self, chunks: List[models.CourseChunk]):
-        """Add course content chunks to the vector store"""
+        """Add course content chunks to the vector store in embedding batches"""
         if not chunks:
             return
-        
+
         documents = [chunk.content for chunk in chunks]
+        # Intern the per-chunk repeated strings so the thousands of chunks
+        # from one course share a single title/link object
         metadatas = [{
-            "course_title": chunk.course_title,
+            "course_title": sys.intern(chunk.course_title),
             "lesson_number": chunk.lesson_number,
-            "lesson_link": chunk.lesson_link,
+            "lesson_link": sys.intern(chunk.lesson_link) if chunk.lesson_link else None,
             "chunk_index": chunk.chunk_index
         } for chunk in chunks]
         # Use title with chunk index for unique IDs
         ids = [f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}" for chunk in chunks]
-        
-        self.course_content.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+
+        for start in range(0, len(documents), self.EMBED_BATCH_SIZE):
+            end = start + self.EMBED_BATCH_SIZE
+            self.course_content.add(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
     
     def clear_all_data(self):
         """Clear all data from both collections"""
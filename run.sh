@@ -13,4 +13,4 @@ echo "Starting Course Materials RAG System..."
 echo "Make sure you have set your GEMINI_API_KEY in .env"
 
 # Change to backend directory and start the server
-cd backend && uv run uvicorn app:app --reload --port 8000
\ No newline at end of file
+cd backend && uv run uvicorn app:app --reload --port 8000 --loop uvloop --http httptools
\ No newline at end of file